@@ -1,8 +1,26 @@
 import asyncio
 import signal
+import sys
 from argparse import Namespace
+from collections.abc import Callable
 
 from webserver import parse_cli_args, create_app
+from webserver.util import SSL_CIPHERS, set_thread_pool_size
+
+_IS_WIN = sys.platform == 'win32'
+_SIGNALS = tuple(
+    sig for name in ('SIGINT', 'SIGTERM', 'SIGBREAK')
+    if (sig := getattr(signal, name, None)) is not None
+)
+
+
+def _install_signals(loop: asyncio.AbstractEventLoop, handler: Callable[..., None]) -> None:
+    for sig in _SIGNALS:
+        if _IS_WIN:  # Windows crap: loops there don't support signal handlers
+            signal.signal(sig, handler)
+        else:
+            # noinspection PyTypeChecker
+            loop.add_signal_handler(sig, handler)
 
 
 def main(args: Namespace):
@@ -13,13 +31,19 @@ def main(args: Namespace):
     conf.bind = f'{args.host}:{args.port}'
     conf.certfile = args.certfile
     conf.keyfile = args.keyfile
+    conf.ciphers = SSL_CIPHERS
     conf.reload = args.reload
+    conf.backlog = args.backlog
     conf.graceful_timeout = 1
-    conf.accesslog = '-'
+    conf.loglevel = args.log_level.upper()
+    conf.accesslog = '-' if args.access_log else None
     if args.ssl:
         conf.insecure_bind = f'{args.host}:80'
-        conf.alpn_protocols.append('h3')
+        conf.alpn_protocols = ['h3', 'h2', 'http/1.1']  # don't mutate the class-level default
         conf.quic_bind = conf.bind.copy()
+        # advertise h3 for a day instead of hypercorn's default hour,
+        # so returning clients go straight to QUIC
+        conf.alt_svc_headers = [f'h3=":{args.port}"; ma=86400']
 
     async def serve_all():
         signal_event = asyncio.Event()
@@ -28,21 +52,19 @@ def main(args: Namespace):
             print('Shutdown signal received')
             signal_event.set()
 
-        for sig in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
-            if (sig_id := getattr(signal, sig, None)) is None:
-                continue
-            try:
-                # noinspection PyTypeChecker
-                asyncio.get_running_loop().add_signal_handler(
-                    sig_id, _sig_handler)
-            except NotImplementedError:
-                # Windows crap
-                signal.signal(sig_id, _sig_handler)
+        _install_signals(asyncio.get_running_loop(), _sig_handler)
+        if args.thread_pool_size is not None:
+            set_thread_pool_size(args.thread_pool_size)
 
         # noinspection PyTypeChecker
         await serve(create_app(args.ssl), conf, shutdown_trigger=signal_event.wait)
 
-    asyncio.new_event_loop().run_until_complete(serve_all())
+    if _IS_WIN:
+        loop_factory = asyncio.new_event_loop
+    else:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    asyncio.run(serve_all(), loop_factory=loop_factory)
 
 
 if __name__ == '__main__':
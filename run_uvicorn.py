@@ -1,8 +1,15 @@
 import asyncio
+import os
 import signal
+import sys
 from argparse import Namespace
 
 from webserver import parse_cli_args
+from webserver.util import SSL_CIPHERS, eager_task_factory, set_thread_pool_size
+
+_IS_WIN = sys.platform == 'win32'
+# watch the package next to this script for reloads, wherever we are started from
+_WEBSERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webserver')
 
 
 def main(args: Namespace):
@@ -14,10 +21,17 @@ def main(args: Namespace):
         port=args.port,
         ssl_keyfile=args.keyfile,
         ssl_certfile=args.certfile,
-        log_level='debug',
+        ssl_ciphers=SSL_CIPHERS,
+        log_level=args.log_level,
+        access_log=args.access_log,
+        loop='asyncio' if _IS_WIN else 'uvloop',
+        http='httptools',
+        ws='websockets',
         reload=args.reload,
-        reload_dirs=['webserver'],
+        reload_dirs=[_WEBSERVER_DIR],
         reload_excludes=['files'],
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
         timeout_graceful_shutdown=1
     )
 
@@ -27,15 +41,25 @@ def main(args: Namespace):
             'webserver.premade.only_redirector:app',
             host=args.host,
             port=80,
-            log_level='debug',
+            log_level='warning',
+            access_log=False,
+            http='httptools',
+            ws='websockets',
+            backlog=args.backlog,
             timeout_graceful_shutdown=1
         )
         servers.append(uvicorn.Server(conf2))
 
     async def serve_all():
-        await asyncio.gather(*(server.serve() for server in servers))
+        asyncio.get_running_loop().set_task_factory(eager_task_factory)
+        if args.thread_pool_size is not None:
+            set_thread_pool_size(args.thread_pool_size)
+        async with asyncio.TaskGroup() as tg:
+            for server in servers:
+                tg.create_task(server.serve())
 
-    asyncio.new_event_loop().run_until_complete(serve_all())
+    # Server.serve() does not set up a loop itself; build it from the config
+    asyncio.run(serve_all(), loop_factory=conf.get_loop_factory())
 
 
 if __name__ == '__main__':
@@ -7,5 +7,20 @@ Aksite @ akioweh.com
 __author__ = 'akioweh'
 __all__ = ['create_app', 'parse_cli_args']
 
-from .main import create_app
+from typing import TYPE_CHECKING
+
 from .util import parse_cli_args
+
+if TYPE_CHECKING:
+    from .main import create_app
+
+
+def __getattr__(name: str):
+    # the app factory pulls in FastAPI, Jinja, mistletoe, etc.;
+    # only import it once something asks for it (PEP 562),
+    # so CLI-only imports like run_uvicorn.py's stay light
+    if name == 'create_app':
+        from .main import create_app
+        globals()['create_app'] = create_app
+        return create_app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
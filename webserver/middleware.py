@@ -1,7 +1,7 @@
 __all__ = ['ServerTimingMiddleware', 'HTTPSRedirectMiddleware']
 
-import time
 from collections.abc import Awaitable
+from time import perf_counter_ns
 
 # noinspection PyProtectedMember
 from starlette.middleware import _MiddlewareFactory
@@ -15,17 +15,23 @@ from starlette.types import Scope, Receive, Send, Message, ASGIApp
 HTTPSRedirectMiddleware: _MiddlewareFactory = HTTPSRedirectMiddleware
 ServerTimingMiddleware: _MiddlewareFactory
 
+_TIMING_HEADER = b'X-Server-Time'
+
 
 class ServerTimingMiddleware:
     def __init__(self, app: ASGIApp) -> None:
         self.app = app
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':  # lifespan & websockets have nothing to time
+            return await self.app(scope, receive, send)
+
         def wrapped_send(message: Message) -> Awaitable[None]:
             if message['type'] == 'http.response.start':
-                elapsed = (time.perf_counter_ns() - start) / 1_000_000_000
-                message['headers'].append((b'X-Server-Time', str(elapsed).encode()))
+                # seconds with ns precision, formatted without going through float
+                elapsed = b'%d.%09d' % divmod(perf_counter_ns() - start, 1_000_000_000)
+                message['headers'].append((_TIMING_HEADER, elapsed))
             return send(message)
 
-        start = time.perf_counter_ns()
+        start = perf_counter_ns()
         await self.app(scope, receive, wrapped_send)
@@ -1,12 +1,15 @@
 """
 Featureless, dedicated app instance
 that redirects all HTTP traffic to HTTPS.
+
+Plain Starlette is enough here;
+every request is answered by the middleware.
 """
 
-from fastapi import FastAPI
-from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
+from starlette.applications import Starlette
+from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 
-app = FastAPI()
+app = Starlette()
 
 # noinspection PyTypeChecker
 app.add_middleware(HTTPSRedirectMiddleware)
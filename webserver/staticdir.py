@@ -10,27 +10,66 @@ and allows access to files without their extensions in the URL.
 __all__ = ['StaticDir']
 
 import asyncio
+import html
 import os
 import posixpath
+import re
 import stat
+import time
 import urllib.parse
+from collections import OrderedDict
 from collections.abc import Sequence, Callable, Iterable
 from contextlib import suppress
-from email.utils import parsedate
-from itertools import filterfalse
+from email.utils import parsedate_tz, mktime_tz
+from functools import lru_cache
 from os import PathLike
 from pathlib import Path
 from typing import Final
 
 import mistletoe  # type: ignore
+from starlette.concurrency import run_in_threadpool
 from starlette.datastructures import Headers, URL
 from starlette.exceptions import HTTPException
 from starlette.requests import Request, SERVER_PUSH_HEADERS_TO_COPY
-from starlette.responses import FileResponse, Response, HTMLResponse, RedirectResponse
+from starlette.responses import FileResponse, Response, HTMLResponse, RedirectResponse, PlainTextResponse
 from starlette.staticfiles import NotModifiedResponse
 from starlette.templating import Jinja2Templates
 from starlette.types import Scope, Receive, Send
 
+# (name, latin-1 encoded name) of the request headers copied onto server push promises
+_PUSH_HEADERS: Final[tuple[tuple[str, bytes], ...]] = tuple(
+    (k, k.encode('latin-1')) for k in SERVER_PUSH_HEADERS_TO_COPY
+)
+
+# matches any character urllib.parse.quote() would escape (with its default safe='/')
+_NEEDS_QUOTING: Final = re.compile(r'[^A-Za-z0-9_.~/-]').search
+# the packaged templates/list_dir.html, written out by hand to skip Jinja for the default case;
+# keep both in sync
+_LISTING_HEAD: Final[str] = (
+    '<!DOCTYPE html>\n<html lang="en">\n<head>\n    <title>{title}</title>\n</head>\n'
+    '<body>\n<h1>{title}</h1>\n<hr>\n<ul>\n'
+)
+_LISTING_TAIL: Final[str] = '</ul>\n<hr>\n</body>\n</html>'
+
+# ((st_mtime_ns, st_size), body, raw response headers) of a file served from memory
+type _CachedFile = tuple[tuple[int, int], bytes, list[tuple[bytes, bytes]]]
+
+_ALLOWED_METHODS: Final[frozenset[str]] = frozenset({'GET', 'HEAD'})
+_METHOD_NOT_ALLOWED_BODY: Final[bytes] = b'Method Not Allowed'
+_METHOD_NOT_ALLOWED_HEADERS: Final[list[tuple[bytes, bytes]]] = PlainTextResponse(
+    _METHOD_NOT_ALLOWED_BODY, status_code=405, headers={'Allow': ', '.join(sorted(_ALLOWED_METHODS))},
+).raw_headers
+
+
+class LargeChunkFileResponse(FileResponse):
+    """``FileResponse`` that reads 1 MiB at a time instead of 64 KiB.
+
+    Servers supporting the ASGI ``http.response.pathsend`` extension (granian)
+    send the file themselves and never use this; for the others, every chunk
+    is a worker-thread read plus a ``send``, so bigger chunks mean far fewer round trips.
+    """
+    chunk_size = 1024 * 1024
+
 
 class StaticDir:
     _DEFAULT_IMPLICIT_EXTS: Final[tuple[str, ...]] = (
@@ -51,18 +90,50 @@ class StaticDir:
     )
     HTML_EXTENSIONS: Final[tuple[str, ...]] = '.html', '.htm'
     AUTO_STRIP_EXTENSIONS: Final[tuple[str, ...]] = HTML_EXTENSIONS + ('.md',)
+    # files up to this size are kept in memory once served (LRU of at most ``MEMORY_CACHE_ENTRIES``)
+    MEMORY_CACHE_MAX_FILE_SIZE: Final[int] = 64 * 1024
+    MEMORY_CACHE_ENTRIES: Final[int] = 1024
+    MARKDOWN_CACHE_ENTRIES: Final[int] = 256
+    RESOLVE_CACHE_ENTRIES: Final[int] = 4096
+    # failed resolutions are remembered as such for this long (unless their directory changes)
+    MISS_CACHE_SECONDS: Final[float] = 5.0
+    MISS_CACHE_ENTRIES: Final[int] = 1024
+    # how often the custom 404 page is looked up again on disk
+    NOT_FOUND_PAGE_RECHECK_SECONDS: Final[float] = 1.0
+    # how long a subdirectory's ".nolist" (non-)existence is trusted in directory listings
+    NOLIST_RECHECK_SECONDS: Final[float] = 5.0
+    NOLIST_CACHE_ENTRIES: Final[int] = 4096
+    # directories last seen with at most this many entries (hidden ones included) are listed on the event loop,
+    # where the scan is cheaper than the threadpool round trip; others (or unknown ones) in the threadpool
+    LISTING_INLINE_MAX_ENTRIES: Final[int] = 256
+    LISTING_SIZE_CACHE_ENTRIES: Final[int] = 4096
 
-    @staticmethod
-    def _default_hidden_predicate(item: os.DirEntry[str]) -> bool:
+    def _default_hidden_predicate(self, item: os.DirEntry[str]) -> bool:
         """Predicate to whether an FS object should be shown in directory listings."""
-        if not (item.is_file() or item.is_dir()):
+        name = item.name
+        if not (is_dir := item.is_dir()) and not item.is_file():
             return True  # hide non-standard FS objects
-        if item.name.startswith('.') and not (item.is_dir() and item.name == '.well-known'):
+        if name[0] == '.' and not (is_dir and name == '.well-known'):
             return True  # hide dotted dirs/files (except .well-known dirs)
-        if item.is_dir() and (item.name.endswith('_files') or os.path.isfile(os.path.join(item.path, '.nolist'))):
+        if is_dir and (name.endswith('_files') or self._has_nolist(item.path)):
             return True  # hide dirs with a ".nolist" file in them
         return False
 
+    def _has_nolist(self, dir_path: str) -> bool:
+        """Whether a directory contains a ``.nolist`` file,
+        remembered for ``NOLIST_RECHECK_SECONDS`` to spare a stat per subdirectory per listing.
+        """
+        now = time.monotonic()
+        if (cached := self._nolist_cache.get(dir_path)) is not None and now - cached[0] < self.NOLIST_RECHECK_SECONDS:
+            return cached[1]
+        has_nolist = os.path.isfile(os.path.join(dir_path, '.nolist'))
+        self._nolist_cache[dir_path] = now, has_nolist
+        if len(self._nolist_cache) > self.NOLIST_CACHE_ENTRIES:
+            # FIFO eviction; listings run in threads, so another one may be inserting or evicting concurrently
+            with suppress(RuntimeError, StopIteration, KeyError):
+                del self._nolist_cache[next(iter(self._nolist_cache))]
+        return has_nolist
+
     def __init__(
             self,
             directory: PathLike[str] | str,
@@ -70,10 +141,14 @@ class StaticDir:
             listing_template_dir: PathLike[str] | str | None = None,
             listing_template_file: PathLike[str] | str = 'list_dir.html',
             implicit_exts: Sequence[str] = _DEFAULT_IMPLICIT_EXTS,
-            hidden_predicate: Callable[[os.DirEntry[str]], bool] = _default_hidden_predicate,
+            hidden_predicate: Callable[[os.DirEntry[str]], bool] | None = None,
+            resolve_cache_ttl: float = 0.0,
+            assume_no_symlinks: bool = False,
     ):
-        directory = os.path.realpath(os.path.abspath(directory))
+        directory = os.path.realpath(directory)  # also makes it absolute
         listing_template_file = str(listing_template_file)
+        # the stock template gets rendered without Jinja (see ``render_listing``)
+        self._stock_listing = listing_template_dir is None and listing_template_file == 'list_dir.html'
         if not os.path.isdir(directory):
             raise FileNotFoundError(f'"{directory}" does not exist or is not a directory')
         if listing_template_dir is None:
@@ -81,180 +156,409 @@ class StaticDir:
         if not os.path.isfile(os.path.join(listing_template_dir, listing_template_file)):
             raise FileNotFoundError(f'Template file "{listing_template_file}" not found in "{listing_template_dir}"')
         self.root_dir = Path(directory)
+        # string forms for the per-request path handling, which sticks to os.path for speed
+        self._root_str = directory
+        self._root_prefix = os.path.join(directory, '')
         self.list_dirs = list_dirs
         self.implicit_exts = implicit_exts
+        self._implicit_exts_set = frozenset(implicit_exts)  # for membership tests
+        # implicit extension -> its priority when several files match an extensionless request
+        self._implicit_ext_ranks = {ext: i for i, ext in enumerate(dict.fromkeys(implicit_exts))}
         self.templates = Jinja2Templates(listing_template_dir)
         self.template_file = listing_template_file
-        self.should_hide = hidden_predicate
+        self.listing_template = self.templates.get_template(listing_template_file)
+        self.should_hide = self._default_hidden_predicate if hidden_predicate is None else hidden_predicate
+        self.resolve_cache_ttl = resolve_cache_ttl
+        # if the tree is known to be symlink-free, paths are normalised lexically instead of walked with realpath;
+        # symlinks that do turn up as the requested entry itself are refused
+        self.assume_no_symlinks = assume_no_symlinks
+        self._file_cache: OrderedDict[str, _CachedFile] = OrderedDict()  # path -> cached file
+        # (path, st_mtime_ns, st_size) -> rendered HTML
+        self._md_cache: OrderedDict[tuple[str, int, int], bytes] = OrderedDict()
+        # directory path -> (monotonic time of the check, whether it has a .nolist file)
+        self._nolist_cache: dict[str, tuple[float, bool]] = {}
+        # directory path -> number of entries its last listing scanned
+        self._listing_sizes: dict[str, int] = {}
+        # ASGI root_path -> that path with a trailing slash
+        self._root_prefixes: dict[str, str] = {}
+        # relative API path -> (resolved path, (st_dev, st_ino, st_mtime_ns) of the containing directory,
+        #                       monotonic time that was last checked)
+        self._resolve_cache: OrderedDict[str, tuple[str, tuple[int, int, int], float]] = OrderedDict()
+        # relative API path -> (monotonic expiry time, (st_dev, st_ino, st_mtime_ns) of the containing directory)
+        self._miss_cache: dict[str, tuple[float, tuple[int, int, int]]] = {}
+        # (monotonic time of the last lookup, the 404 page or None)
+        self._404_page: tuple[float, _CachedFile | None] = (-float('inf'), None)
 
-    @staticmethod
-    def get_rel_path(scope: Scope) -> str:
+    def get_rel_path(self, scope: Scope) -> str:
         """Converts an HTTP path from the ASGI scope to a relative API path"""
         path: str = scope['path']
         root = scope.get('root_path', '')
-        if not root.endswith('/'):
-            root += '/'
-        if not path.startswith(root):  # should not happen if routing is correct
+        if (prefix := self._root_prefixes.get(root)) is None:  # one entry per mount point, in practice
+            prefix = self._root_prefixes[root] = root if root.endswith('/') else f'{root}/'
+        if not path.startswith(prefix):  # should not happen if routing is correct
             raise HTTPException(status_code=404)
-        rel_path = path[len(root):]
-        return rel_path
+        return path[len(prefix):]
 
-    def resolve_path(self, rel_path: str) -> tuple[Path, os.stat_result] | tuple[None, None]:
+    def resolve_path(self, rel_path: str) -> tuple[str, os.stat_result] | tuple[None, None]:
         """Resolves a relative API path to an absolute OS FS path
         while also checking for existence and legality.
 
-        Returns ``pathlib.Path`` and ``os.stat_result``, or two Nones if resolution failed.
+        Successful resolutions are cached for as long as the directory
+        containing the requested name is unchanged (same inode and mtime),
+        as any entry being added, removed or renamed there bumps its mtime.
+        Within ``resolve_cache_ttl`` seconds of the last such check, not even that is checked again.
+        Failures are likewise remembered for ``MISS_CACHE_SECONDS`` while the directory is unchanged.
+
+        Returns the real OS path as a string and its ``os.stat_result``, or two Nones if resolution failed.
         """
         if rel_path.startswith('/'):
             return None, None  # happens if request is like "GET //..." and root is "/"
-        raw_path = self.root_dir / rel_path
+        now = time.monotonic()
+        if (cached := self._resolve_cache.get(rel_path)) is not None and now - cached[2] < self.resolve_cache_ttl:
+            with suppress(OSError):
+                cached_stat = os.lstat(cached[0])
+                self._resolve_cache.move_to_end(rel_path)
+                return cached[0], cached_stat
+        try:
+            parent_stat = os.stat(os.path.dirname(os.path.join(self._root_str, rel_path)))
+        except (OSError, ValueError):
+            return None, None  # the containing directory doesn't even exist
+        dir_version = (parent_stat.st_dev, parent_stat.st_ino, parent_stat.st_mtime_ns)
+        if (miss := self._miss_cache.get(rel_path)) is not None and miss[1] == dir_version and now < miss[0]:
+            return None, None  # known not to resolve; spares scanners' repeated misses the full lookup
+        if cached is not None and cached[1] == dir_version:
+            cached_path = cached[0]
+            with suppress(OSError):
+                cached_stat = os.lstat(cached_path)  # re-stat the file itself; its contents may have changed
+                self._resolve_cache[rel_path] = cached_path, dir_version, now
+                self._resolve_cache.move_to_end(rel_path)
+                return cached_path, cached_stat
+
+        resolved = self._resolve_path(rel_path)
+        if (path := resolved[0]) is not None:
+            self._resolve_cache[rel_path] = path, dir_version, now
+            self._resolve_cache.move_to_end(rel_path)
+            if len(self._resolve_cache) > self.RESOLVE_CACHE_ENTRIES:
+                self._resolve_cache.popitem(last=False)
+        else:
+            if cached is not None:
+                del self._resolve_cache[rel_path]
+            self._miss_cache[rel_path] = now + self.MISS_CACHE_SECONDS, dir_version
+            if len(self._miss_cache) > self.MISS_CACHE_ENTRIES:
+                del self._miss_cache[next(iter(self._miss_cache))]  # FIFO eviction
+        return resolved
+
+    def _resolve_path(self, rel_path: str) -> tuple[str, os.stat_result] | tuple[None, None]:
+        """Uncached implementation of ``resolve_path``."""
+        raw_path = os.path.join(self._root_str, rel_path)
 
         try:  # 1:1 FS path matching
-            path = raw_path.resolve(strict=True)
-            stat_result = path.lstat()
-        except (OSError, PermissionError, FileNotFoundError):
+            if self.assume_no_symlinks:
+                path = os.path.normpath(raw_path)
+                if stat.S_ISLNK((stat_result := os.lstat(path)).st_mode):
+                    return None, None
+            else:
+                path = os.path.realpath(raw_path, strict=True)
+                stat_result = os.lstat(path)
+        except (OSError, ValueError):  # ValueError: e.g. an embedded null character
             # maybe extension is implicit?
             if not (name := rel_path.rpartition('/')[-1]):
                 return None, None  # nope, slash-endings cannot be files
-            if not (parent_dir := raw_path.parent).is_dir():
+            if not os.path.isdir(parent_dir := os.path.dirname(raw_path)):
                 return None, None  # nope, more than just the file does not resolve
-            if any(  # check for .htm* files
-                    (new_path := Path(parent_dir, f'{name}{ext}')).is_file()
-                    for ext in self.HTML_EXTENSIONS
-            ) or any(  # check for other implicit extensions
-                (new_path := file).suffix in self.implicit_exts and file.is_file()
-                for file in parent_dir.glob(f'{name}.*', case_sensitive=True)
-            ):
-                path = new_path
+            follow_symlinks = not self.assume_no_symlinks
+            for ext in self.HTML_EXTENSIONS:  # the common case; stat those directly
+                try:
+                    candidate = os.path.join(parent_dir, f'{name}{ext}')
+                    stat_result = os.stat(candidate, follow_symlinks=follow_symlinks)
+                except (OSError, ValueError):
+                    continue
+                if stat.S_ISREG(stat_result.st_mode):
+                    break
+            else:
+                if (found := self._find_implicit_ext(parent_dir, name)) is None:
+                    return None, None
+                candidate, stat_result = found
+            if follow_symlinks:
+                path = os.path.realpath(candidate)  # the candidate may be (or sit behind) a symlink or ".."
             else:
-                return None, None
-            stat_result = path.lstat()
+                path = os.path.normpath(candidate)  # a symlink would have failed the is-regular-file check
 
         # finally, check for legality
-        if not path.is_relative_to(self.root_dir):
+        if path != self._root_str and not path.startswith(self._root_prefix):
             return None, None  # directory traversal!
         return path, stat_result
 
-    def path_for(self, scope: Scope, fs_path: Path, trim_ext: bool = False) -> str:
+    def _find_implicit_ext(self, parent_dir: str, name: str) -> tuple[str, os.stat_result] | None:
+        """Finds a file named ``name.*`` in ``parent_dir`` whose last suffix is an implicit extension,
+        so ``foo`` also finds ``foo.tar.gz`` or ``foo.v2.pdf``.
+
+        One pass over the directory is much cheaper than stat'ing each of the dozens of candidates;
+        if several match, the one whose extension comes first in ``implicit_exts`` wins.
+        """
+        prefix = f'{name}.'
+        follow_symlinks = not self.assume_no_symlinks
+        best: os.DirEntry[str] | None = None
+        best_rank = len(self._implicit_ext_ranks)
+        try:
+            with os.scandir(parent_dir) as entries:
+                for item in entries:
+                    if not item.name.startswith(prefix):
+                        continue
+                    # ranked by the last suffix only, as with the old ``glob(f'{name}.*')`` lookup
+                    rank = self._implicit_ext_ranks.get(posixpath.splitext(item.name)[1], best_rank)
+                    if rank < best_rank and item.is_file(follow_symlinks=follow_symlinks):
+                        best, best_rank = item, rank
+            if best is None:
+                return None
+            return best.path, best.stat(follow_symlinks=follow_symlinks)
+        except OSError:
+            return None
+
+    def path_for(self, scope: Scope, fs_path: str, trim_ext: bool = False) -> str:
         """Gets the absolute HTTP path for a given file.
-        Assumes the input path is valid and exists.
+        Assumes the input path is valid, exists and lies within the root directory.
         """
         api_root = scope.get('root_path', '')
-        rel_path = fs_path.relative_to(self.root_dir).as_posix()
-        if fs_path.suffix in self.HTML_EXTENSIONS or (trim_ext and fs_path.suffix in self.implicit_exts):
-            rel_path = rel_path.removesuffix(fs_path.suffix)
+        rel_path = fs_path[len(self._root_prefix):]
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        stem, ext = posixpath.splitext(rel_path)
+        if ext in self.HTML_EXTENSIONS or (trim_ext and ext in self._implicit_exts_set):
+            rel_path = stem
         return posixpath.join('/', api_root, rel_path)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
-        request = Request(scope, receive, send)
         rel_path = self.get_rel_path(scope)
-        response = self.handle_request(rel_path, request)
+        response = await self.handle_request(rel_path, scope)
         await response(scope, receive, send)
 
-    def handle_request(self, rel_path: str, request: Request) -> Response:
-        if request.method not in ('GET', 'HEAD'):
-            raise HTTPException(status_code=405)
+    async def handle_request(self, rel_path: str, scope: Scope) -> Response:
+        if scope['method'] not in _ALLOWED_METHODS:
+            return self.get_response_405()
         path, stat_result = self.resolve_path(rel_path)
         if path is None or stat_result is None:  # double-check to make mypy happy
             return self.get_response_404()
 
         if stat.S_ISREG(stat_result.st_mode):
-            return self.get_response_file(path, stat_result, rel_path, request)
+            return self.get_response_file(path, stat_result, rel_path, scope)
         elif stat.S_ISDIR(stat_result.st_mode):
             if not self.list_dirs:
                 return self.get_response_404()
             if rel_path and not rel_path.endswith('/'):  # directory URLs should redirect to always end in "/"
-                url = URL(scope=request.scope)
+                url = URL(scope=scope)
                 url = url.replace(path=url.path + '/')
                 return RedirectResponse(url=url)
-            return self.get_response_dir(path, rel_path, request)
+            return await self.get_response_dir(path, rel_path, scope)
 
         raise HTTPException(status_code=404)  # some other FS object
 
-    def get_response_file(self, path: Path, stat_result: os.stat_result, rel_path: str, request: Request) -> Response:
-        if path.suffix == '.md' and not rel_path.endswith('.md'):  # do not render (serve raw) if explicit extension
-            rendered = mistletoe.markdown(path.read_text())  # todo: cache rendered HTML
-            return HTMLResponse(rendered)
-        response = FileResponse(path, stat_result=stat_result)
-        if self.is_not_modified(request.headers, response.headers):
+    def get_response_file(self, path: str, stat_result: os.stat_result, rel_path: str, scope: Scope) -> Response:
+        if path.endswith('.md') and not rel_path.endswith('.md'):  # do not render (serve raw) if explicit extension
+            return HTMLResponse(self.render_markdown(path, stat_result))
+        headers = Headers(scope=scope)
+        if stat_result.st_size <= self.MEMORY_CACHE_MAX_FILE_SIZE and 'range' not in headers:
+            response = self.get_response_cached_file(path, stat_result, scope)
+        else:
+            response = LargeChunkFileResponse(path, stat_result=stat_result)
+        if self.is_not_modified(headers, response.headers, stat_result):
             return NotModifiedResponse(response.headers)
         return response
 
-    def get_response_dir(self, path: Path, rel_path: str, request: Request) -> Response:
-        if any(  # check if we have 'index.htm?' file to serve
-                (index_path := (path / f'index{ext}')).is_file()
-                for ext in self.HTML_EXTENSIONS
-        ):
-            return self.get_response_file(index_path, index_path.stat(), rel_path,request)
-
-        # otherwise, list the directory
-        # list[tuple[link, display_name]]
-        listing = [('../', '../')]  # always include a link to the parent directory
-        for item in filterfalse(self.should_hide, os.scandir(path)):
-            file_name = item.name
-            if item.is_dir():
-                file_name += '/'
-            elif any(file_name.endswith(ext := ext_) for ext_ in self.AUTO_STRIP_EXTENSIONS):
-                file_name = file_name.removesuffix(ext)
-            file_url = urllib.parse.quote(file_name)
-            listing.append((file_url, file_name))
-
-        return self.templates.TemplateResponse(
-            request,
-            self.template_file,
-            {
-                'title': f'Things in {rel_path}',
-                'files': listing,
-            }
-        )
+    def render_markdown(self, path: str, stat_result: os.stat_result) -> bytes:
+        """Renders a Markdown file to HTML, memoized on the file's path, mtime and size."""
+        key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+        if (rendered := self._md_cache.get(key)) is not None:
+            self._md_cache.move_to_end(key)
+            return rendered
+        with open(path) as f:
+            rendered = mistletoe.markdown(f.read()).encode()
+        self._md_cache[key] = rendered
+        if len(self._md_cache) > self.MARKDOWN_CACHE_ENTRIES:
+            self._md_cache.popitem(last=False)
+        return rendered
+
+    def get_response_cached_file(self, path: str, stat_result: os.stat_result, scope: Scope) -> Response:
+        """Serves a small file from memory, reading it only on first use
+        or after it changed (checked against the request's ``stat_result``).
+
+        Headers are taken from a ``FileResponse`` so they match files served from disk.
+        """
+        version = (stat_result.st_mtime_ns, stat_result.st_size)
+        if (cached := self._file_cache.get(path)) is not None and cached[0] == version:
+            self._file_cache.move_to_end(path)
+            _, body, raw_headers = cached
+        else:
+            file_response = LargeChunkFileResponse(path, stat_result=stat_result)
+            try:
+                with open(path, 'rb') as f:
+                    body = f.read()
+            except OSError:
+                return file_response
+            if len(body) != stat_result.st_size:  # changed under us; don't cache a torn read
+                return file_response
+            raw_headers = file_response.raw_headers
+            self._file_cache[path] = version, body, raw_headers
+            if len(self._file_cache) > self.MEMORY_CACHE_ENTRIES:
+                self._file_cache.popitem(last=False)
+
+        response = Response(b'' if scope['method'] == 'HEAD' else body)
+        response.raw_headers = raw_headers.copy()  # middlewares may append to the headers
+        return response
+
+    async def get_response_dir(self, path: str, rel_path: str, scope: Scope) -> Response:
+        for ext in self.HTML_EXTENSIONS:  # check if we have 'index.htm?' file to serve
+            with suppress(OSError):
+                if stat.S_ISREG((stat_result := os.stat(index_path := os.path.join(path, f'index{ext}'))).st_mode):
+                    return self.get_response_file(index_path, stat_result, rel_path, scope)
+
+        # otherwise, list the directory; off the event loop unless it is known to be small,
+        # as huge or cold directories can take a while
+        if self._listing_sizes.get(path, self.LISTING_INLINE_MAX_ENTRIES + 1) <= self.LISTING_INLINE_MAX_ENTRIES:
+            listing, scanned = self.list_dir(path)
+        else:
+            listing, scanned = await run_in_threadpool(self.list_dir, path)
+        self._listing_sizes[path] = scanned
+        if len(self._listing_sizes) > self.LISTING_SIZE_CACHE_ENTRIES:
+            del self._listing_sizes[next(iter(self._listing_sizes))]  # FIFO eviction
+        listing.insert(0, ('../', '../'))  # always include a link to the parent directory
+
+        return HTMLResponse(self.render_listing(f'Things in {rel_path}', listing, scope))
+
+    def render_listing(self, title: str, listing: list[tuple[str, str]], scope: Scope) -> str:
+        """Renders the directory listing page; ``listing`` holds (link, display name) pairs."""
+        if not self._stock_listing:
+            return self.listing_template.render(
+                request=Request(scope),  # for custom templates; ours doesn't need it
+                title=title,
+                files=listing,
+            )
+        escape = html.escape
+        parts = [_LISTING_HEAD.format(title=escape(title))]
+        parts.extend(f'    <li><a href="{link}">{escape(name)}</a></li>\n' for link, name in listing)
+        parts.append(_LISTING_TAIL)
+        return ''.join(parts)
+
+    def list_dir(self, path: str) -> tuple[list[tuple[str, str]], int]:
+        """The (link, display name) pairs to show in a directory's listing, sorted by name,
+        and the number of entries scanned to get them (hidden ones included).
+
+        Everything comes from a single ``os.scandir`` pass:
+        ``DirEntry`` type checks reuse the ``d_type`` from ``readdir`` instead of stat'ing each entry.
+        """
+        listing = []
+        scanned = 0
+        quote = urllib.parse.quote
+        with os.scandir(path) as entries:
+            for item in entries:
+                scanned += 1
+                if self.should_hide(item):
+                    continue
+                file_name = item.name
+                if item.is_dir():  # DirEntry caches this; no extra stat
+                    file_name += '/'
+                elif file_name.endswith(self.AUTO_STRIP_EXTENSIONS):  # one C-level check for the common no-match
+                    file_name = os.path.splitext(file_name)[0]
+                listing.append((quote(file_name) if _NEEDS_QUOTING(file_name) else file_name, file_name))
+        listing.sort(key=lambda p: p[1].casefold())  # readdir order is arbitrary
+        return listing, scanned
+
+    @staticmethod
+    def get_response_405() -> Response:
+        """A prebuilt 405, without the detour through raising and handling an ``HTTPException``."""
+        response = Response(_METHOD_NOT_ALLOWED_BODY, status_code=405)
+        response.raw_headers = _METHOD_NOT_ALLOWED_HEADERS.copy()  # middlewares may append to the headers
+        return response
 
     def get_response_404(self) -> Response:
+        """Serves the root's ``404.htm(l)`` page, if there is one, from memory.
+
+        The page is looked up on disk again at most every ``NOT_FOUND_PAGE_RECHECK_SECONDS``,
+        so a flood of 404s costs no syscalls at all.
+        """
+        checked_at, page = self._404_page
+        if (now := time.monotonic()) - checked_at >= self.NOT_FOUND_PAGE_RECHECK_SECONDS:
+            page = self._load_404_page(page)
+            self._404_page = now, page
+        if page is None:
+            raise HTTPException(status_code=404)
+        _, body, raw_headers = page
+        response = Response(body, status_code=404)
+        response.raw_headers = raw_headers.copy()  # middlewares may append to the headers
+        return response
+
+    def _load_404_page(self, previous: _CachedFile | None) -> _CachedFile | None:
+        """Finds and reads the 404 page, reusing ``previous`` if the file is unchanged."""
         for ext in self.HTML_EXTENSIONS:
-            path = self.root_dir / f'404{ext}'
-            with suppress(FileNotFoundError, PermissionError, OSError):
-                if stat.S_ISREG((stat_result := path.stat()).st_mode):
-                    return FileResponse(path, stat_result=stat_result, status_code=404)
-        raise HTTPException(status_code=404)
+            path = os.path.join(self._root_str, f'404{ext}')
+            with suppress(OSError):
+                if not stat.S_ISREG((stat_result := os.stat(path)).st_mode):
+                    continue
+                version = (stat_result.st_mtime_ns, stat_result.st_size)
+                if previous is not None and previous[0] == version:
+                    return previous
+                with open(path, 'rb') as f:
+                    body = f.read()
+                if len(body) != stat_result.st_size:
+                    return None  # changed under us; try again on the next recheck
+                raw_headers = LargeChunkFileResponse(path, stat_result=stat_result, status_code=404).raw_headers
+                return version, body, raw_headers
+        return None
 
-    async def push_assets(self, paths: Iterable[Path], scope: Scope, send: Send) -> None:
+    async def push_assets(self, paths: Iterable[str], scope: Scope, send: Send) -> None:
         urls = (self.path_for(scope, path) for path in paths)
         headers = Headers(scope=scope)
-        headers_filtered = tuple(
-            (k.encode('latin-1'), v.encode('latin-1'))
-            for k in SERVER_PUSH_HEADERS_TO_COPY
-            for v in headers.getlist(k)
-        )
+        headers_filtered: list[tuple[bytes, bytes]] = []
+        for k, k_enc in _PUSH_HEADERS:
+            headers_filtered.extend((k_enc, v.encode('latin-1')) for v in headers.getlist(k))
         promises = (send({'type': 'http.response.push', 'path': url, 'headers': headers_filtered}) for url in urls)
         await asyncio.gather(*promises)
 
-    def asset_dependencies(self, path: Path, stat_result: os.stat_result) -> list[Path]:
+    def asset_dependencies(self, path: str, stat_result: os.stat_result) -> list[str]:
         """Returns a list of asset dependencies for the given path, if any."""
-        if not stat.S_ISREG(stat_result.st_mode) or path.suffix not in self.HTML_EXTENSIONS:
+        stem, ext = os.path.splitext(path)
+        if not stat.S_ISREG(stat_result.st_mode) or ext not in self.HTML_EXTENSIONS:
             return []
         # we only deal with HTML files
         # ...and for now we shortcut on MS-Office generated htm formats
-        asset_dir = path.parent / (path.stem + '_files')
         try:
-            return [asset_dir / item for item in os.listdir(asset_dir)]
-        except (FileNotFoundError, PermissionError, OSError):
+            with os.scandir(f'{stem}_files') as entries:
+                return [item.path for item in entries if item.is_file()]
+        except OSError:
             return []
 
     @staticmethod
-    def is_not_modified(request_headers: Headers, response_headers: Headers) -> bool:
+    def is_not_modified(request_headers: Headers, response_headers: Headers, stat_result: os.stat_result) -> bool:
+        """Evaluates the request's conditional headers against the file being served.
+
+        As per RFC 9110, ``If-Modified-Since`` is only considered without ``If-None-Match``.
+        """
         # etag matching
-        if (reqs_etag_header := request_headers.get('If-None-Match')) is None:
+        if (reqs_etag_header := request_headers.get('If-None-Match')) is not None:
+            if (etag := response_headers.get('ETag')) is None:
+                return False
+            if ',' not in reqs_etag_header:  # the common case of a single (cached) tag
+                tag = reqs_etag_header.strip()
+                return tag == '*' or tag.removeprefix('W/') == etag
+            return any(
+                (tag := tag_.strip()) == '*' or tag.removeprefix('W/') == etag
+                for tag_ in reqs_etag_header.split(',')
+            )
+
+        # modification timestamp check; our Last-Modified header is the mtime in whole seconds
+        if (if_modified_since := request_headers.get('If-Modified-Since')) is None:
             return False
-        if (etag := response_headers.get('ETag')) is None:
+        if (since := _parse_http_date(if_modified_since)) is None:
             return False
-        etag = etag.strip()
-        match_etags = (tag.strip() for tag in reqs_etag_header.lstrip('W/ ').split(','))
-        if any(tag == etag for tag in match_etags):
-            return True
+        return since >= int(stat_result.st_mtime)
 
-        # modification timestamp check
-        if_modified_since = parsedate(request_headers.get('If-Modified-Since'))
-        last_modified = parsedate(response_headers.get('Last-Modified'))
-        if (if_modified_since and last_modified) and if_modified_since >= last_modified:
-            return True
 
-        return False
+@lru_cache(maxsize=256)  # clients keep sending back the same few Last-Modified values
+def _parse_http_date(value: str) -> int | None:
+    """Parses an HTTP date header value to a POSIX timestamp, or None if malformed."""
+    if (parsed := parsedate_tz(value)) is None:
+        return None
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return None
@@ -1,10 +1,25 @@
-__all__ = ['parse_cli_args']
+__all__ = ['parse_cli_args', 'eager_task_factory', 'set_thread_pool_size', 'SSL_CIPHERS']
 
-from argparse import ArgumentParser, Namespace
+import asyncio
+from collections.abc import Coroutine
+from functools import cache
+from typing import TYPE_CHECKING, Any, Final
 
+if TYPE_CHECKING:
+    from argparse import ArgumentParser, Namespace
+
+# forward-secret AEAD suites only (affects TLS 1.2; TLS 1.3 suites are fixed),
+# with CHACHA20 for clients without AES hardware
+SSL_CIPHERS: Final[str] = 'ECDHE+AESGCM:ECDHE+CHACHA20'
+
+
+@cache
+def _cli_parser() -> 'ArgumentParser':
+    """Builds the command line parser, once."""
+    # imported here since only the runner scripts parse arguments;
+    # app processes (e.g. reload/worker imports of webserver) never need argparse
+    from argparse import ArgumentParser
 
-def parse_cli_args() -> Namespace:
-    """Helper function to parse standard command line arguments."""
     parser = ArgumentParser(prog='python -m webserver', description='gws2')
     parser.add_argument('--host', default='0.0.0.0',
                         help='Host address to run the server on. Default: %(default)s')
@@ -13,10 +28,53 @@ def parse_cli_args() -> Namespace:
     parser.add_argument('-r', '--reload', action='store_true', help='Enable auto-reload.')
     parser.add_argument('--keyfile', help='SSL key file path.')
     parser.add_argument('--certfile', help='SSL certificate file path.')
+    parser.add_argument('--backlog', type=int, default=2048,
+                        help='Maximum number of pending connections. Default: %(default)s')
+    parser.add_argument('--limit-concurrency', type=int,
+                        help='Maximum number of concurrent connections before responding with 503 (uvicorn only). '
+                             'Default: unlimited')
+    parser.add_argument('--thread-pool-size', type=int,
+                        help='Worker threads for blocking file system work (file reads, large directory listings). '
+                             'Default: the libraries\' own (40 for AnyIO, min(32, CPUs + 4) for asyncio)')
+    parser.add_argument('--log-level', default='warning', choices=('critical', 'error', 'warning', 'info', 'debug'),
+                        help='Server log level; "info" and below also log every request. Default: %(default)s')
+    return parser
+
+
+def parse_cli_args() -> 'Namespace':
+    """Helper function to parse standard command line arguments."""
+    parser = _cli_parser()
     _args = parser.parse_args()
     if bool(_args.keyfile) != bool(_args.certfile):
         parser.error('Both keyfile and certfile must be provided to enable SSL.')
     _args.ssl = bool(_args.keyfile)
+    _args.access_log = _args.log_level in ('info', 'debug')
     if _args.port is None:
         _args.port = 443 if _args.ssl else 80  # nominal defaults
     return _args
+
+
+def eager_task_factory(
+        loop: asyncio.AbstractEventLoop,
+        coro: Coroutine[Any, Any, Any],
+        **kwargs: Any,
+) -> asyncio.Task:
+    """Like ``asyncio.eager_task_factory``, but also eager on uvloop,
+    which always forwards ``eager_start=None`` to the task factory.
+    """
+    kwargs['eager_start'] = True
+    return asyncio.Task(coro, loop=loop, **kwargs)
+
+
+def set_thread_pool_size(size: int) -> None:
+    """Sizes both thread pools that blocking work is sent to: AnyIO's default limiter
+    (used by Starlette, e.g. for file responses and directory listings) and the running loop's default executor.
+
+    Must be called from within the running event loop, before it starts serving.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import anyio.to_thread
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=size))